@@ -2,16 +2,77 @@
 HubSpot API Service
 Handles all interactions with HubSpot CRM API v3
 """
+import asyncio
+import hashlib
+import io
+import itertools
+import random
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as _Urllib3HTTPError
+from urllib3.util.retry import Retry
 import time
 import logging
-from typing import Dict, List, Optional, Iterator, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Iterator, Any, Union
 from datetime import datetime, timezone
 from decimal import Decimal
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # fall back to the stdlib parser
+    import json
+    _loads = lambda b: json.loads(b.decode("utf-8"))
+
+try:
+    import brotli  # noqa: F401 - lets urllib3/httpx/aiohttp decode br transparently
+    _ACCEPT_ENCODING = "gzip, br"
+except ImportError:  # only advertise encodings the clients can decode
+    _ACCEPT_ENCODING = "gzip"
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is only required for async/prefetched extraction
+    aiohttp = None
+
+try:
+    import ijson
+except ImportError:  # ijson is only required for streaming page parsing
+    ijson = None
+
+try:
+    import httpx
+except ImportError:  # httpx is only required for the HTTP/2 transport
+    httpx = None
+
+try:
+    import requests_cache
+except ImportError:  # requests-cache is only required when response caching is enabled
+    requests_cache = None
+
 
 logger = logging.getLogger(__name__)
 
+# Transport errors raised by whichever HTTP client is in use
+_TIMEOUT_ERRORS = (requests.exceptions.Timeout,) + ((httpx.TimeoutException,) if httpx else ())
+_REQUEST_ERRORS = (requests.exceptions.RequestException,) + ((httpx.HTTPError,) if httpx else ())
+_TRANSIENT_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout
+) + ((httpx.TransportError,) if httpx else ())
+# Raised by _loads for bodies that are not JSON (e.g. a proxy's HTML error page)
+_DECODE_ERRORS = (ValueError,)
+# Errors raised while reading a streamed body after the headers arrived
+_STREAM_READ_ERRORS = (_Urllib3HTTPError, requests.exceptions.RequestException)
+_ASYNC_TIMEOUT_ERRORS = (asyncio.TimeoutError,) + ((httpx.TimeoutException,) if httpx else ())
+_ASYNC_REQUEST_ERRORS = ((aiohttp.ClientError,) if aiohttp else ()) + ((httpx.HTTPError,) if httpx else ())
+_ASYNC_TRANSIENT_ERRORS = (asyncio.TimeoutError,) + (
+    (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) if aiohttp else ()
+) + ((httpx.TransportError,) if httpx else ())
+
 
 class HubSpotAPIError(Exception):
     """Base exception for HubSpot API errors"""
@@ -28,67 +89,390 @@ class HubSpotRateLimitError(HubSpotAPIError):
     pass
 
 
-class HubSpot APIService:
+# Process-wide sessions keyed by base_url, used with shared_session=True
+_SHARED_SESSIONS: Dict[str, requests.Session] = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def _build_session(session: Optional[requests.Session] = None) -> requests.Session:
+    """
+    Mount a pooled, retrying HTTPS adapter on a session
+    
+    Args:
+        session: Session to configure (a new plain session if None)
+        
+    Returns:
+        Configured session
+    """
+    if session is None:
+        session = requests.Session()
+    
+    # urllib3 only retries failures before a response arrives; retryable
+    # statuses and mid-body disconnects are handled by HubSpotAPIService so
+    # that no failure is retried by two layers
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=6,
+            backoff_factor=0.75,
+            # Otherwise urllib3 retries 429/503 responses carrying Retry-After
+            respect_retry_after_header=False,
+            # Search and batch read POSTs are read-only, so they are safe to retry
+            allowed_methods=frozenset(["GET", "POST"])
+        )
+    )
+    session.mount("https://", adapter)
+    return session
+
+
+def _parse_timestamp(value: Union[datetime, str]) -> datetime:
+    """
+    Normalize a timestamp to a datetime
+    
+    Args:
+        value: datetime, or an ISO 8601 string such as hs_lastmodifieddate
+            or a checkpoint's last_modified
+        
+    Returns:
+        Parsed datetime
+    """
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _decode_body(content: bytes) -> Any:
+    """
+    Parse a JSON response body
+    
+    Args:
+        content: Raw response body
+        
+    Returns:
+        Parsed JSON value
+        
+    Raises:
+        HubSpotAPIError: If the body is not valid JSON
+    """
+    try:
+        return _loads(content)
+    except _DECODE_ERRORS as e:
+        logger.error("Invalid JSON in API response: %s", e)
+        raise HubSpotAPIError(f"Invalid JSON in API response: {e}")
+
+
+class _CheckpointBatcher:
+    """
+    Runs checkpoint callbacks on a background thread, coalescing bursts
+    
+    While a checkpoint is being written, newer checkpoints only replace the
+    pending state; the latest one is written once the previous write is done.
+    """
+    
+    def __init__(self, callback: callable):
+        self._callback = callback
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._future = None
+        self._pending_checkpoint: Optional[Dict[str, Any]] = None
+    
+    def submit(self, **state):
+        """Record the latest checkpoint state, writing it if the writer is idle"""
+        self._pending_checkpoint = state
+        self.poll()
+    
+    def poll(self):
+        """Start writing the pending checkpoint if the previous write finished"""
+        if self._pending_checkpoint is None:
+            return
+        if self._future is not None:
+            if not self._future.done():
+                return
+            # Surface errors from the previous write
+            self._future.result()
+        
+        state, self._pending_checkpoint = self._pending_checkpoint, None
+        self._future = self._executor.submit(self._callback, **state)
+    
+    def flush(self, suppress_errors: bool = False):
+        """
+        Wait for in-flight writes and write any pending checkpoint
+        
+        Args:
+            suppress_errors: Log callback errors instead of raising them, so they
+                don't replace an exception that is already propagating
+        """
+        try:
+            if self._future is not None:
+                self._future.result()
+            if self._pending_checkpoint is not None:
+                state, self._pending_checkpoint = self._pending_checkpoint, None
+                self._executor.submit(self._callback, **state).result()
+        except Exception:
+            if not suppress_errors:
+                raise
+            logger.exception("Checkpoint callback failed during error handling")
+        finally:
+            self._executor.shutdown(wait=True)
+
+
+class HubSpotAPIService:
     """Service for interacting with HubSpot CRM API v3"""
     
     # Rate Limits (HubSpot: 150 requests per 10 seconds for Professional tier)
     RATE_LIMIT_MAX = 150
     RATE_LIMIT_WINDOW = 10  # seconds
     
-    def __init__(self, api_key: str, base_url: str = "https://api.hubapi.com"):
+    # Search API limit (HubSpot: 5 requests per second, without rate limit headers)
+    SEARCH_RATE_LIMIT_MAX = 5
+    SEARCH_RATE_LIMIT_WINDOW = 1  # seconds
+    
+    # Back off once the server reports this many (or fewer) requests left
+    SERVER_RATE_LIMIT_FLOOR = 2
+    # Give up after this many consecutive 429 responses for one request
+    MAX_RATE_LIMIT_RETRIES = 5
+    # Retries for transient network errors and 5xx responses
+    MAX_TRANSIENT_RETRIES = 3
+    TRANSIENT_STATUSES = (500, 502, 503, 504)
+    
+    # The Search API refuses to page past this many results for one query
+    SEARCH_RESULT_LIMIT = 10000
+    
+    # Response cache lifetimes (seconds) when caching is enabled
+    CACHE_DEFAULT_EXPIRE = 300
+    CACHE_PAGE_EXPIRE = 3600
+    
+    # Deal properties fetched when none are specified
+    DEFAULT_PROPERTIES = (
+        "dealname", "amount", "dealstage", "pipeline", "closedate",
+        "createdate", "hs_lastmodifieddate", "hubspot_owner_id",
+        "description", "dealtype", "hs_priority",
+        "num_associated_contacts", "num_associated_companies",
+        "hs_is_closed", "hs_is_closed_won",
+        "hs_forecast_amount", "hs_forecast_probability"
+    )
+    DEFAULT_PROPERTIES_CSV = ",".join(DEFAULT_PROPERTIES)
+    
+    _ARCHIVED_PARAM = {True: "true", False: "false"}
+    
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.hubapi.com",
+        cache: bool = False,
+        cache_name: str = ".hubspot_cache",
+        http2: bool = False,
+        shared_session: bool = False,
+        validate: str = "lazy"
+    ):
         """
         Initialize HubSpot API Service
         
         Args:
             api_key: HubSpot Private App access token
             base_url: HubSpot API base URL
+            cache: Cache GET responses on disk (requires requests-cache)
+            cache_name: SQLite cache file prefix used when caching is enabled;
+                each access token gets its own file
+            http2: Send requests over a multiplexed HTTP/2 connection
+                (requires httpx[http2]; cannot be combined with cache)
+            shared_session: Reuse one process-wide connection pool per base_url
+                across instances. The pooled session holds no credentials;
+                this instance's headers are sent with every request.
+            validate: Credential check run on construction, as in
+                validate_credentials(). The default "lazy" makes no request;
+                the first API call validates the token instead.
         """
+        if validate not in ("full", "cheap", "lazy"):
+            raise ValueError(f"Unknown validation mode: {validate}")
+        
         self.api_key = api_key
         self.base_url = base_url
         self.headers = {
             "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
+            "Content-Type": "application/json",
+            "Accept-Encoding": _ACCEPT_ENCODING
+        }
+        self._content_encoding_logged = False
+        
+        # Credentials are validated lazily by the first successful request
+        self._validated = False
+        
+        # Precomputed request pieces reused on every page
+        self._deals_url = f"{base_url}/crm/v3/objects/deals"
+        self._default_params = {
+            "limit": 100,
+            "properties": self.DEFAULT_PROPERTIES_CSV,
+            "archived": "false"
         }
         
-        # Rate limiting tracking
-        self._request_times: List[float] = []
+        # Token-bucket rate limiting. All limiter timestamps come from
+        # time.monotonic() so wall-clock steps (NTP, DST) can't stall or starve it
+        self._tokens = float(self.RATE_LIMIT_MAX)
+        self._last_refill = time.monotonic()
+        self._refill_rate = self.RATE_LIMIT_MAX / self.RATE_LIMIT_WINDOW
+        self._rate_limit_lock = threading.Lock()
+        
+        # Separate, smaller bucket for the Search API's own limit
+        self._search_tokens = float(self.SEARCH_RATE_LIMIT_MAX)
+        self._search_last_refill = time.monotonic()
+        self._search_refill_rate = self.SEARCH_RATE_LIMIT_MAX / self.SEARCH_RATE_LIMIT_WINDOW
+        self._search_rate_limit_lock = threading.Lock()
+        
+        # Server-reported rate limit state (-1 until the first response)
+        self._server_remaining = -1
+        self._server_reset_at = 0.0
+        
+        # Shared HTTP session so keep-alive connections are reused across pages
+        self._cache_enabled = cache
+        self._shared_session = shared_session
+        if shared_session:
+            if cache:
+                raise ValueError("Response caching is not supported with a shared session")
+            with _SHARED_LOCK:
+                if base_url not in _SHARED_SESSIONS:
+                    _SHARED_SESSIONS[base_url] = _build_session()
+                self._session = _SHARED_SESSIONS[base_url]
+        elif cache:
+            if requests_cache is None:
+                raise HubSpotAPIError("requests-cache is required for response caching")
+            # requests-cache leaves Authorization out of the cache key, so keep
+            # one cache per token to never serve one token's data to another
+            token_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+            self._session = _build_session(requests_cache.CachedSession(
+                cache_name=f"{cache_name}_{token_hash}",
+                backend="sqlite",
+                expire_after=self.CACHE_DEFAULT_EXPIRE,
+                cache_control=True,
+                allowable_methods=("GET",),
+                allowable_codes=(200,)
+            ))
+        else:
+            self._session = _build_session()
+        
+        # A shared session carries no credentials, so send them per request
+        self._request_headers = self.headers if shared_session else None
+        if not shared_session:
+            self._session.headers.update(self.headers)
+        
+        # Optional HTTP/2 client; requests remains the default transport
+        self._http2 = http2
+        self._client = None
+        if http2:
+            if httpx is None:
+                raise HubSpotAPIError("httpx is required for the HTTP/2 transport")
+            if cache:
+                raise ValueError("Response caching is not supported with the HTTP/2 transport")
+            self._client = httpx.Client(
+                http2=True,
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=8),
+                timeout=httpx.Timeout(30.0, connect=5.0)
+            )
         
         logger.info("HubSpot API Service initialized")
+        
+        if validate != "lazy":
+            try:
+                self.validate_credentials(mode=validate)
+            except Exception:
+                self.close()
+                raise
+    
+    def close(self):
+        """Close the underlying HTTP session and release pooled connections"""
+        # A shared session outlives any single instance
+        if not self._shared_session:
+            self._session.close()
+        if self._client is not None:
+            self._client.close()
     
-    def validate_credentials(self) -> Dict[str, Any]:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
+    def _cache_kwargs(self, expire_after: Optional[int]) -> Dict[str, Any]:
+        """
+        Per-request cache options, empty when caching is disabled
+        
+        Args:
+            expire_after: Seconds to keep the response (None = bypass the cache)
+        """
+        if not self._cache_enabled:
+            return {}
+        if expire_after is None:
+            return {"expire_after": requests_cache.DO_NOT_CACHE}
+        return {"expire_after": expire_after}
+    
+    def validate_credentials(self, mode: str = "full") -> Dict[str, Any]:
         """
         Validate HubSpot API credentials
         
+        Construction defaults to lazy validation; an explicit call defaults to
+        "full" because callers asking for a check expect a request to be made.
+        
+        Args:
+            mode: "full" fetches one deal (also proves the deals read scope),
+                "cheap" fetches only account metadata, and "lazy" skips the
+                request so the first real API call validates the token
+                (raising HubSpotAuthenticationError on 401)
+        
         Returns:
-            Dictionary with validation results including portal_id and scopes
+            Dictionary with validation results including portal_id and scopes.
+            In lazy mode, valid is True only once a request has succeeded and
+            deferred is True while validation is still pending.
             
         Raises:
             HubSpotAuthenticationError: If credentials are invalid
+            ValueError: If mode is unknown
         """
+        if mode not in ("full", "cheap", "lazy"):
+            raise ValueError(f"Unknown validation mode: {mode}")
+        
+        if mode == "lazy":
+            logger.info("Deferring HubSpot credential validation to the first request")
+            return {
+                "valid": self._validated,
+                "deferred": not self._validated,
+                "scopes": [],
+                "rate_limit": None
+            }
+        
         logger.info("Validating HubSpot credentials")
         
         try:
-            # Test API key by fetching account info
-            url = f"{self.base_url}/crm/v3/objects/deals"
-            params = {"limit": 1}
+            if mode == "cheap":
+                # Account metadata is a few hundred bytes and needs no CRM scope
+                url = f"{self.base_url}/account-info/v3/details"
+                params = {}
+            else:
+                # Test API key by fetching a single deal
+                url = self._deals_url
+                params = {"limit": 1}
             
-            response = requests.get(
+            response = self._request_with_retry(
+                "GET",
                 url,
-                headers=self.headers,
+                10,
                 params=params,
-                timeout=10
+                # Never cache validation: a revoked token must fail right away
+                **self._cache_kwargs(None)
             )
             
             if response.status_code == 401:
                 raise HubSpotAuthenticationError("Invalid API key")
             
             if response.status_code == 403:
-                error_data = response.json()
+                error_data = _loads(response.content)
                 raise HubSpotAuthenticationError(
                     f"Insufficient permissions: {error_data.get('message')}"
                 )
             
             response.raise_for_status()
+            self._update_server_rate_limit(response.headers)
+            self._validated = True
             
             # Extract rate limit info from headers
             rate_limit_info = {
@@ -99,14 +483,22 @@ class HubSpot APIService:
             
             logger.info("Credentials validated successfully")
             
+            if mode == "cheap":
+                return {
+                    "valid": True,
+                    "portal_id": _loads(response.content).get("portalId"),
+                    "scopes": [],  # Account info doesn't prove any CRM scope
+                    "rate_limit": rate_limit_info
+                }
+            
             return {
                 "valid": True,
                 "scopes": ["crm.objects.deals.read"],  # Inferred from successful call
                 "rate_limit": rate_limit_info
             }
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Credential validation failed: {e}")
+        except _REQUEST_ERRORS + _DECODE_ERRORS as e:
+            logger.error("Credential validation failed: %s", e)
             raise HubSpotAuthenticationError(f"API validation failed: {e}")
     
     def _wait_for_rate_limit(self):
@@ -114,25 +506,103 @@ class HubSpot APIService:
         Implement rate limiting by waiting if necessary
         Ensures we don't exceed HubSpot's rate limits
         """
-        now = time.time()
-        
-        # Remove requests older than the rate limit window
-        cutoff_time = now - self.RATE_LIMIT_WINDOW
-        self._request_times = [t for t in self._request_times if t > cutoff_time]
+        with self._rate_limit_lock:
+            # The server's own counter is authoritative when it is running low
+            if 0 <= self._server_remaining <= self.SERVER_RATE_LIMIT_FLOOR:
+                wait_time = max(0.0, self._server_reset_at - time.monotonic())
+                if wait_time > 0:
+                    logger.warning(
+                        "Server reports %d requests remaining. Waiting %.2f seconds",
+                        self._server_remaining,
+                        wait_time
+                    )
+                    time.sleep(wait_time)
+                self._server_remaining = -1
+            
+            now = time.monotonic()
+            
+            # Refill tokens for the time elapsed since the last request
+            self._tokens = min(
+                self.RATE_LIMIT_MAX,
+                self._tokens + (now - self._last_refill) * self._refill_rate
+            )
+            self._last_refill = now
+            
+            # If the bucket is empty, wait until one token has accumulated
+            if self._tokens < 1:
+                wait_time = (1 - self._tokens) / self._refill_rate
+                logger.warning("Rate limit reached. Waiting %.2f seconds", wait_time)
+                time.sleep(wait_time)
+                self._tokens = 1.0
+                self._last_refill = time.monotonic()
+            
+            # Consume a token for this request
+            self._tokens -= 1
+    
+    def _wait_for_search_rate_limit(self):
+        """
+        Wait for a token from the Search API bucket
         
-        # If we're at the limit, wait until the oldest request expires
-        if len(self._request_times) >= self.RATE_LIMIT_MAX:
-            wait_time = self.RATE_LIMIT_WINDOW - (now - self._request_times[0])
-            if wait_time > 0:
-                logger.warning(f"Rate limit reached. Waiting {wait_time:.2f} seconds")
+        Search requests also go through the general limiter in _send_request.
+        """
+        with self._search_rate_limit_lock:
+            now = time.monotonic()
+            
+            self._search_tokens = min(
+                self.SEARCH_RATE_LIMIT_MAX,
+                self._search_tokens + (now - self._search_last_refill) * self._search_refill_rate
+            )
+            self._search_last_refill = now
+            
+            if self._search_tokens < 1:
+                wait_time = (1 - self._search_tokens) / self._search_refill_rate
+                logger.warning("Search rate limit reached. Waiting %.2f seconds", wait_time)
                 time.sleep(wait_time)
-                # Clean up old requests again after waiting
-                now = time.time()
-                cutoff_time = now - self.RATE_LIMIT_WINDOW
-                self._request_times = [t for t in self._request_times if t > cutoff_time]
+                self._search_tokens = 1.0
+                self._search_last_refill = time.monotonic()
+            
+            self._search_tokens -= 1
+    
+    def _update_server_rate_limit(self, headers) -> None:
+        """
+        Record the rate limit state reported by HubSpot response headers
+        
+        Args:
+            headers: Response headers
+        """
+        remaining = int(headers.get("X-HubSpot-RateLimit-Remaining", -1))
+        if remaining < 0:
+            return
+        
+        interval_ms = int(headers.get("X-HubSpot-RateLimit-Interval-Milliseconds", 10000))
+        self._server_remaining = remaining
+        self._server_reset_at = time.monotonic() + interval_ms / 1000
+    
+    def _build_deal_params(
+        self,
+        limit: int,
+        after: Optional[str],
+        properties: Optional[List[str]],
+        archived: bool
+    ) -> Dict[str, Any]:
+        """Build query parameters for the deals list endpoint"""
+        if properties is None and limit >= 100 and not archived:
+            # Common case: reuse the prebuilt (read-only) defaults
+            params = self._default_params
+        else:
+            params = {
+                "limit": min(limit, 100),  # API max is 100
+                "properties": (
+                    self.DEFAULT_PROPERTIES_CSV if properties is None
+                    else ",".join(properties)
+                ),
+                "archived": self._ARCHIVED_PARAM[archived]
+            }
         
-        # Record this request
-        self._request_times.append(now)
+        if after:
+            return {**params, "after": after}
+        
+        return params
     
     def get_deals(
         self,
@@ -157,74 +627,458 @@ class HubSpot APIService:
             
         Raises:
             HubSpotAPIError: If API request fails
-            HubSpotRateLimitError: If rate limited
-        """
-        # Apply rate limiting
-        self._wait_for_rate_limit()
-        
-        url = f"{self.base_url}/crm/v3/objects/deals"
-        
-        # Default properties if none specified
-        if properties is None:
-            properties = [
-                "dealname", "amount", "dealstage", "pipeline", "closedate",
-                "createdate", "hs_lastmodifieddate", "hubspot_owner_id",
-                "description", "dealtype", "hs_priority",
-                "num_associated_contacts", "num_associated_companies",
-                "hs_is_closed", "hs_is_closed_won",
-                "hs_forecast_amount", "hs_forecast_probability"
-            ]
-        
-        params = {
-            "limit": min(limit, 100),  # API max is 100
-            "properties": ",".join(properties),
-            "archived": str(archived).lower()
-        }
+            HubSpotRateLimitError: If still rate limited after retries
+        """
+        params = self._build_deal_params(limit, after, properties, archived)
+        response = self._request_deals_page(params, after, timeout)
         
-        if after:
-            params["after"] = after
+        data = _decode_body(response.content)
         
-        try:
-            response = requests.get(
-                url,
-                headers=self.headers,
-                params=params,
-                timeout=timeout
-            )
+        logger.info("Fetched %d deals", len(data.get('results', [])))
+        
+        return data
+    
+    def _request_deals_page(
+        self,
+        params: Dict[str, Any],
+        after: Optional[str],
+        timeout: int,
+        stream: bool = False
+    ) -> requests.Response:
+        """
+        Issue a deals list request
+        
+        Args:
+            params: Query parameters for the deals endpoint
+            after: Pagination cursor included in params (controls caching)
+            timeout: Request timeout in seconds
+            stream: Leave the response body unread for incremental parsing
             
-            # Handle rate limiting
+        Returns:
+            Successful response
+        """
+        return self._send_request(
+            "GET",
+            self._deals_url,
+            timeout,
+            params=params,
+            stream=stream,
+            # The first page changes as deals are added; pages behind a
+            # cursor are stable for a while, which makes checkpoint resumes cheap
+            **self._cache_kwargs(None if after is None else self.CACHE_PAGE_EXPIRE)
+        )
+    
+    def _send_request(
+        self,
+        method: str,
+        url: str,
+        timeout: int,
+        **kwargs
+    ) -> requests.Response:
+        """
+        Issue an API request, honoring rate limits and Retry-After
+        
+        Args:
+            method: HTTP method
+            url: Request URL
+            timeout: Request timeout in seconds
+            **kwargs: Extra arguments for the session request
+            
+        Returns:
+            Successful response
+            
+        Raises:
+            HubSpotAPIError: If API request fails
+            HubSpotRateLimitError: If still rate limited after retries
+        """
+        cached = self._cached_response(method, url, timeout, **kwargs)
+        if cached is not None:
+            return cached
+        
+        for attempt in range(self.MAX_RATE_LIMIT_RETRIES + 1):
+            # Apply rate limiting
+            self._wait_for_rate_limit()
+            
+            try:
+                response = self._request_with_retry(method, url, timeout, **kwargs)
+                
+            except _TIMEOUT_ERRORS:
+                logger.error("Request timeout after %s seconds", timeout)
+                raise HubSpotAPIError(f"Request timeout after {timeout} seconds")
+            
+            except _REQUEST_ERRORS as e:
+                logger.error("API request failed: %s", e)
+                raise HubSpotAPIError(f"API request failed: {e}")
+            
+            if getattr(response, "from_cache", False):
+                # Ignore the stale rate limit headers stored with the cached response
+                return response
+            
+            self._update_server_rate_limit(response.headers)
+            
+            if not self._content_encoding_logged:
+                # Confirm once per run that the server honored Accept-Encoding
+                logger.info(
+                    "Response Content-Encoding: %s",
+                    response.headers.get('Content-Encoding', 'identity')
+                )
+                self._content_encoding_logged = True
+            
+            # Handle rate limiting by honoring Retry-After
             if response.status_code == 429:
+                response.close()
                 retry_after = int(response.headers.get('Retry-After', 10))
-                logger.warning(f"Rate limited. Retry after {retry_after} seconds")
-                raise HubSpotRateLimitError(f"Rate limited. Retry after {retry_after}s")
+                logger.warning("Rate limited. Retry after %d seconds", retry_after)
+                if attempt < self.MAX_RATE_LIMIT_RETRIES:
+                    time.sleep(retry_after)
+                continue
             
             # Handle authentication errors
             if response.status_code == 401:
+                response.close()
                 raise HubSpotAuthenticationError("Invalid or expired API key")
             
-            # Handle other errors
-            response.raise_for_status()
+            try:
+                # Handle other errors
+                response.raise_for_status()
+            except _REQUEST_ERRORS as e:
+                response.close()
+                logger.error("API request failed: %s", e)
+                raise HubSpotAPIError(f"API request failed: {e}")
+            
+            self._validated = True
+            return response
+        
+        raise HubSpotRateLimitError(
+            f"Rate limited after {self.MAX_RATE_LIMIT_RETRIES} retries"
+        )
+    
+    def _cached_response(self, method: str, url: str, timeout: int, **kwargs):
+        """
+        Look a request up in the response cache without touching the network
+        
+        Checked before the rate limiter so cache hits never wait for a token.
+        
+        Args:
+            method: HTTP method
+            url: Request URL
+            timeout: Request timeout in seconds
+            **kwargs: Extra arguments for the request
             
-            data = response.json()
+        Returns:
+            Cached response, or None on a miss or when caching doesn't apply
+        """
+        if (
+            not self._cache_enabled
+            or method != "GET"
+            or kwargs.get("expire_after") is requests_cache.DO_NOT_CACHE
+        ):
+            return None
+        
+        # requests-cache answers a synthetic 504 instead of sending on a miss;
+        # only 200s are ever stored, so a 504 can't be a real cached response
+        response = self._http_request(method, url, timeout, only_if_cached=True, **kwargs)
+        if response.status_code != 504:
+            return response
+        response.close()
+        return None
+    
+    def _request_with_retry(self, method: str, url: str, timeout: int, **kwargs):
+        """
+        Send a request, retrying transient failures with exponential backoff
+        
+        Retries 5xx server responses and connections dropped while the body
+        is read. Connection errors before a response are left to the urllib3
+        Retry on the session adapter, except on the httpx transport, which
+        has no adapter.
+        
+        Args:
+            method: HTTP method
+            url: Request URL
+            timeout: Request timeout in seconds
+            **kwargs: Extra arguments for the request
             
-            logger.info(f"Fetched {len(data.get('results', []))} deals")
+        Returns:
+            Response from requests or httpx
+        """
+        for attempt in range(self.MAX_TRANSIENT_RETRIES + 1):
+            reading = False
+            try:
+                response = self._http_request(method, url, timeout, **kwargs)
+                
+                if (
+                    response.status_code not in self.TRANSIENT_STATUSES
+                    or attempt >= self.MAX_TRANSIENT_RETRIES
+                ):
+                    if not kwargs.get("stream"):
+                        # Read the body inside the loop so a connection that
+                        # drops mid-body is retried like any other failure
+                        reading = True
+                        response.content
+                    return response
+                
+                response.close()
+                reason = f"HTTP {response.status_code}"
             
-            return data
+            except _TRANSIENT_ERRORS as e:
+                # The adapter already retried errors raised before the response
+                if attempt >= self.MAX_TRANSIENT_RETRIES or not (reading or self._client is not None):
+                    raise
+                reason = e
             
-        except requests.exceptions.Timeout:
-            logger.error(f"Request timeout after {timeout} seconds")
-            raise HubSpotAPIError(f"Request timeout after {timeout} seconds")
+            delay = self._backoff_delay(attempt)
+            logger.warning(
+                "Transient error on %s %s (attempt %d/%d): %s. Retrying in %.2f seconds",
+                method,
+                url,
+                attempt + 1,
+                self.MAX_TRANSIENT_RETRIES,
+                reason,
+                delay
+            )
+            time.sleep(delay)
+    
+    @staticmethod
+    def _backoff_delay(attempt: int) -> float:
+        """Exponential backoff with jitter for the given zero-based retry attempt"""
+        return min(30, 2 ** attempt + random.random())
+    
+    def _http_request(self, method: str, url: str, timeout: int, **kwargs):
+        """
+        Send a single request on the active transport
+        
+        Args:
+            method: HTTP method
+            url: Request URL
+            timeout: Request timeout in seconds
+            **kwargs: Extra arguments for the request
+            
+        Returns:
+            Response from requests or httpx
+        """
+        if self._client is not None:
+            # httpx streams through a separate API; callers only stream on requests
+            kwargs.pop("stream", None)
+            return self._client.request(method, url, timeout=timeout, **kwargs)
         
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {e}")
-            raise HubSpotAPIError(f"API request failed: {e}")
+        return self._session.request(
+            method,
+            url,
+            timeout=timeout,
+            headers=self._request_headers,
+            **kwargs
+        )
+    
+    def _iter_deals_streaming(
+        self,
+        params: Dict[str, Any],
+        after: Optional[str] = None,
+        timeout: int = 30
+    ):
+        """
+        Fetch a deals page and yield each deal as soon as it is parsed
+        
+        Only one deal is materialized at a time instead of the whole page. If
+        the connection drops mid-page, the page is requested again and the
+        deals already yielded are skipped.
+        
+        Args:
+            params: Query parameters for the deals endpoint
+            after: Pagination cursor included in params
+            timeout: Request timeout in seconds
+            
+        Yields:
+            Individual deal records
+            
+        Returns:
+            Cursor for the next page, or None on the last page
+        """
+        yielded = 0
+        
+        for attempt in range(self.MAX_TRANSIENT_RETRIES + 1):
+            response = self._request_deals_page(params, after, timeout, stream=True)
+            next_after = None
+            builder = None
+            parsed = 0
+            
+            try:
+                if getattr(response, "from_cache", False):
+                    # A cached response's raw stream is already consumed; the
+                    # stored body is in memory anyway
+                    body = io.BytesIO(response.content)
+                else:
+                    # Let urllib3 undo any Content-Encoding before ijson reads the body
+                    response.raw.decode_content = True
+                    body = response.raw
+                
+                for prefix, event, value in ijson.parse(body, use_float=True):
+                    if builder is not None:
+                        builder.event(event, value)
+                        if prefix == "results.item" and event == "end_map":
+                            parsed += 1
+                            # Replay after a reconnect: skip deals already yielded
+                            if parsed > yielded:
+                                yielded = parsed
+                                yield builder.value
+                            builder = None
+                    elif prefix == "results.item" and event == "start_map":
+                        builder = ijson.ObjectBuilder()
+                        builder.event(event, value)
+                    elif prefix == "paging.next.after":
+                        next_after = value
+                
+                return next_after
+            
+            except ijson.JSONError as e:
+                logger.error("Invalid JSON in deals response: %s", e)
+                raise HubSpotAPIError(f"Invalid JSON in deals response: {e}")
+            
+            except _STREAM_READ_ERRORS as e:
+                if attempt >= self.MAX_TRANSIENT_RETRIES:
+                    logger.error("Connection lost while streaming deals response: %s", e)
+                    raise HubSpotAPIError(f"Connection lost while streaming deals response: {e}")
+                reason = e
+            
+            finally:
+                response.close()
+            
+            delay = self._backoff_delay(attempt)
+            logger.warning(
+                "Connection lost mid-page after %d deals (attempt %d/%d): %s. Retrying in %.2f seconds",
+                yielded,
+                attempt + 1,
+                self.MAX_TRANSIENT_RETRIES,
+                reason,
+                delay
+            )
+            time.sleep(delay)
+    
+    def get_changed_deals(
+        self,
+        since: Union[datetime, str],
+        after: Optional[str] = None,
+        properties: Optional[List[str]] = None,
+        limit: int = 100,
+        timeout: int = 30
+    ) -> Dict[str, Any]:
+        """
+        Fetch deals modified since a point in time via the CRM Search API
+        
+        Args:
+            since: Only deals with hs_lastmodifieddate >= since are returned
+                (datetime or ISO 8601 string)
+            after: Pagination cursor
+            properties: List of deal properties to fetch
+            limit: Number of results per page (max 100)
+            timeout: Request timeout in seconds
+            
+        Returns:
+            Dictionary containing results and pagination info
+            
+        Raises:
+            HubSpotAPIError: If API request fails
+            HubSpotRateLimitError: If still rate limited after retries
+        """
+        payload = {
+            "filterGroups": [{
+                "filters": [{
+                    "propertyName": "hs_lastmodifieddate",
+                    "operator": "GTE",
+                    "value": int(_parse_timestamp(since).timestamp() * 1000)
+                }]
+            }],
+            "sorts": [{"propertyName": "hs_lastmodifieddate", "direction": "ASCENDING"}],
+            "properties": list(properties or self.DEFAULT_PROPERTIES),
+            "limit": min(limit, 100)
+        }
+        
+        if after:
+            payload["after"] = after
+        
+        # Search has its own limit on top of the general one
+        self._wait_for_search_rate_limit()
+        
+        response = self._send_request(
+            "POST",
+            f"{self._deals_url}/search",
+            timeout,
+            json=payload
+        )
+        
+        data = _decode_body(response.content)
+        
+        logger.info("Fetched %d changed deals", len(data.get('results', [])))
+        
+        return data
+    
+    def get_deals_by_ids(
+        self,
+        ids: List[str],
+        properties: Optional[List[str]] = None,
+        max_workers: int = 4,
+        timeout: int = 30
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch specific deals by ID via the batch read endpoint
+        
+        IDs are sent in batches of 100; batches are independent of each other
+        so they are fetched concurrently.
+        
+        Args:
+            ids: Deal IDs to fetch
+            properties: List of deal properties to fetch
+            max_workers: Maximum number of concurrent batch requests
+            timeout: Request timeout in seconds
+            
+        Returns:
+            Deal records in the order of ids (IDs not found are omitted)
+            
+        Raises:
+            HubSpotAPIError: If API request fails
+            HubSpotRateLimitError: If still rate limited after retries
+        """
+        url = f"{self._deals_url}/batch/read"
+        props = list(properties or self.DEFAULT_PROPERTIES)
+        
+        id_iter = iter(ids)
+        chunks = []
+        while True:
+            chunk = list(itertools.islice(id_iter, 100))
+            if not chunk:
+                break
+            chunks.append(chunk)
+        
+        def read_batch(chunk: List[str]) -> List[Dict[str, Any]]:
+            response = self._send_request(
+                "POST",
+                url,
+                timeout,
+                json={
+                    "properties": props,
+                    "inputs": [{"id": deal_id} for deal_id in chunk]
+                }
+            )
+            return _decode_body(response.content).get("results", [])
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            batches = list(executor.map(read_batch, chunks))
+        
+        # Batch read does not guarantee ordering, so restore the input order
+        by_id = {deal["id"]: deal for batch in batches for deal in batch}
+        deals = [by_id[deal_id] for deal_id in ids if deal_id in by_id]
+        
+        logger.info("Fetched %d of %d requested deals", len(deals), len(ids))
+        
+        return deals
     
     def get_all_deals(
         self,
         properties: Optional[List[str]] = None,
         archived: bool = False,
         checkpoint_callback: Optional[callable] = None,
-        checkpoint_interval: int = 5
+        checkpoint_interval: int = 5,
+        prefetch: bool = False,
+        since: Optional[Union[datetime, str]] = None
     ) -> Iterator[Dict[str, Any]]:
         """
         Fetch all deals with automatic pagination and checkpoint support
@@ -232,55 +1086,537 @@ class HubSpot APIService:
         Args:
             properties: List of deal properties to fetch
             archived: Whether to include archived deals
-            checkpoint_callback: Function to call at each checkpoint
+            checkpoint_callback: Function to call at each checkpoint. It runs on
+                a background thread, so it must be thread-safe; checkpoints
+                submitted while one is still being written are coalesced into
+                the latest, and an exception it raises surfaces on a later page
+                or when extraction finishes
             checkpoint_interval: Number of pages between checkpoints
+            prefetch: Fetch the next page while the current one is consumed
+                (requires aiohttp, or httpx with the HTTP/2 transport)
+            since: Only fetch deals modified since this time using the Search
+                API (datetime or ISO 8601 string). Checkpoints then also receive
+                last_modified, the newest hs_lastmodifieddate seen, which can be
+                passed back as the next run's since. When a query reaches the
+                Search API's 10,000 result limit it is restarted from
+                last_modified, so deals sharing that timestamp may repeat.
             
         Yields:
             Individual deal records
+            
+        Raises:
+            ValueError: If since is combined with archived or prefetch
         """
+        if since is not None:
+            if archived or prefetch:
+                raise ValueError("archived and prefetch are not supported together with since")
+            since = _parse_timestamp(since)
+        
+        # Prefetched pages arrive from a background event loop; checkpoints are
+        # still taken here, once the caller has received every deal of a page
+        prefetched = None
+        if prefetch and since is None:
+            prefetched = self._run_async_generator(
+                self._iter_pages_async(properties=properties, archived=archived)
+            )
+        
         after = None
         page_count = 0
         total_deals = 0
+        last_modified = None
+        # Parsed last_modified; ISO strings with and without fractional
+        # seconds don't sort correctly as text
+        last_modified_at = None
+        # Results paged through for the current search query
+        search_results = 0
         
-        while True:
+        # Bound once to skip the attribute lookup on every page
+        _log_info = logger.info
+        
+        # Checkpoint writes run in the background so they don't stall paging
+        checkpointer = _CheckpointBatcher(checkpoint_callback) if checkpoint_callback else None
+        failed = False
+        
+        try:
+            while True:
+                try:
+                    restart_query = False
+                    
+                    if since is not None:
+                        data = self.get_changed_deals(
+                            since,
+                            after=after,
+                            properties=properties
+                        )
+                        
+                        results = data.get("results", [])
+                        page_deals = len(results)
+                        search_results += page_deals
+                        
+                        for deal in results:
+                            total_deals += 1
+                            modified = deal.get("properties", {}).get("hs_lastmodifieddate")
+                            if modified:
+                                modified_at = _parse_timestamp(modified)
+                                if last_modified_at is None or modified_at > last_modified_at:
+                                    last_modified, last_modified_at = modified, modified_at
+                            yield deal
+                        
+                        next_after = data.get("paging", {}).get("next", {}).get("after")
+                        
+                        if next_after is not None and search_results >= self.SEARCH_RESULT_LIMIT:
+                            # Results are sorted by hs_lastmodifieddate, so restart
+                            # the query from the newest timestamp seen so far
+                            restart = last_modified_at or since
+                            if restart.timestamp() <= since.timestamp():
+                                raise HubSpotAPIError(
+                                    f"More than {self.SEARCH_RESULT_LIMIT} deals share "
+                                    f"hs_lastmodifieddate {last_modified}"
+                                )
+                            logger.info("Search result limit reached, restarting from %s", last_modified)
+                            since = restart
+                            search_results = 0
+                            restart_query = True
+                    
+                    elif prefetched is None and ijson is not None and self._client is None:
+                        # Stream deals straight off the socket, one at a time
+                        params = self._build_deal_params(100, after, properties, archived)
+                        page_deals = 0
+                        pages = self._iter_deals_streaming(params, after)
+                        while True:
+                            try:
+                                deal = next(pages)
+                            except StopIteration as stop:
+                                next_after = stop.value
+                                break
+                            page_deals += 1
+                            total_deals += 1
+                            yield deal
+                    else:
+                        if prefetched is not None:
+                            data = next(prefetched)
+                        else:
+                            data = self.get_deals(
+                                limit=100,
+                                after=after,
+                                properties=properties,
+                                archived=archived
+                            )
+                        
+                        results = data.get("results", [])
+                        page_deals = len(results)
+                        
+                        # Yield each deal
+                        for deal in results:
+                            total_deals += 1
+                            yield deal
+                        
+                        next_after = data.get("paging", {}).get("next", {}).get("after")
+                    
+                    page_count += 1
+                    _log_info("Page %d: %d deals (Total: %d)", page_count, page_deals, total_deals)
+                    
+                    if checkpointer:
+                        checkpointer.poll()
+                    
+                    # Checkpoint
+                    if checkpointer and page_count % checkpoint_interval == 0:
+                        if since is not None:
+                            checkpointer.submit(
+                                page=page_count,
+                                deals_so_far=total_deals,
+                                last_modified=last_modified
+                            )
+                        else:
+                            checkpointer.submit(page=page_count, deals_so_far=total_deals)
+                    
+                    # Check for next page
+                    if next_after is None:
+                        # Persist the final high-water mark so the next run resumes from it
+                        if since is not None and checkpointer and page_count % checkpoint_interval:
+                            checkpointer.submit(
+                                page=page_count,
+                                deals_so_far=total_deals,
+                                last_modified=last_modified
+                            )
+                        logger.info("Extraction complete. Total: %d deals, %d pages", total_deals, page_count)
+                        break
+                    
+                    after = None if restart_query else next_after
+                    
+                except HubSpotAPIError as e:
+                    logger.error("API error on page %d: %s", page_count, e)
+                    raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            if prefetched is not None:
+                prefetched.close()
+            if checkpointer:
+                checkpointer.flush(suppress_errors=failed)
+    
+    def get_all_deals_columnar(
+        self,
+        properties: Optional[List[str]] = None,
+        archived: bool = False,
+        batch_size: int = 1000
+    ) -> Iterator[Dict[str, List[Any]]]:
+        """
+        Fetch all deals as column batches instead of per-deal dicts
+        
+        Each batch maps "id" and every requested property to a list of values,
+        which can be handed straight to pandas or pyarrow.
+        
+        Args:
+            properties: List of deal properties to fetch
+            archived: Whether to include archived deals
+            batch_size: Number of deals per batch
+            
+        Yields:
+            Dictionaries of column name to list of values
+        """
+        names = tuple(properties or self.DEFAULT_PROPERTIES)
+        ids: List[str] = []
+        cols: Dict[str, List[Any]] = {p: [] for p in names}
+        
+        for deal in self.get_all_deals(properties=properties, archived=archived):
+            ids.append(deal["id"])
+            props = deal.get("properties", {})
+            for p, col in cols.items():
+                col.append(props.get(p))
+            
+            if len(ids) >= batch_size:
+                yield {"id": ids, **cols}
+                ids = []
+                cols = {p: [] for p in names}
+        
+        if ids:
+            yield {"id": ids, **cols}
+    
+    async def _fetch_deals_page_async(
+        self,
+        session: "aiohttp.ClientSession",
+        semaphore: asyncio.BoundedSemaphore,
+        params: Dict[str, Any],
+        timeout: int = 30
+    ) -> Dict[str, Any]:
+        """
+        Fetch a single deals page asynchronously
+        
+        Args:
+            session: Open aiohttp session (httpx.AsyncClient when using HTTP/2)
+            semaphore: Semaphore bounding in-flight requests
+            params: Query parameters for the deals endpoint
+            timeout: Request timeout in seconds
+            
+        Returns:
+            Dictionary containing results and pagination info
+            
+        Raises:
+            HubSpotAPIError: If API request fails
+            HubSpotRateLimitError: If still rate limited after retries
+        """
+        for attempt in range(self.MAX_RATE_LIMIT_RETRIES + 1):
             try:
-                data = self.get_deals(
-                    limit=100,
-                    after=after,
-                    properties=properties,
-                    archived=archived
+                status, headers, body = await self._request_page_async(
+                    session, semaphore, params, timeout
                 )
+            
+            except _ASYNC_TIMEOUT_ERRORS:
+                logger.error("Request timeout after %s seconds", timeout)
+                raise HubSpotAPIError(f"Request timeout after {timeout} seconds")
+            
+            except _ASYNC_REQUEST_ERRORS as e:
+                logger.error("API request failed: %s", e)
+                raise HubSpotAPIError(f"API request failed: {e}")
+            
+            self._update_server_rate_limit(headers)
+            
+            if status == 429:
+                retry_after = int(headers.get('Retry-After', 10))
+                logger.warning("Rate limited. Retry after %d seconds", retry_after)
+                if attempt < self.MAX_RATE_LIMIT_RETRIES:
+                    await asyncio.sleep(retry_after)
+                continue
+            
+            if status == 401:
+                raise HubSpotAuthenticationError("Invalid or expired API key")
+            
+            if status >= 400:
+                logger.error("API request failed: HTTP %d", status)
+                raise HubSpotAPIError(f"API request failed: HTTP {status}")
+            
+            return _decode_body(body)
+        
+        raise HubSpotRateLimitError(
+            f"Rate limited after {self.MAX_RATE_LIMIT_RETRIES} retries"
+        )
+    
+    async def _request_page_async(
+        self,
+        session: "aiohttp.ClientSession",
+        semaphore: asyncio.BoundedSemaphore,
+        params: Dict[str, Any],
+        timeout: int
+    ):
+        """
+        Request a deals page, retrying transient failures with exponential backoff
+        
+        The async clients have no adapter-level retries, so connection errors,
+        dropped bodies and 5xx responses are all retried here.
+        
+        Args:
+            session: Open aiohttp session (httpx.AsyncClient when using HTTP/2)
+            semaphore: Semaphore bounding in-flight requests
+            params: Query parameters for the deals endpoint
+            timeout: Request timeout in seconds
+            
+        Returns:
+            Tuple of status code, headers and body
+        """
+        url = self._deals_url
+        
+        for attempt in range(self.MAX_TRANSIENT_RETRIES + 1):
+            async with semaphore:
+                # Rate limiter sleeps, so keep it off the event loop
+                await asyncio.to_thread(self._wait_for_rate_limit)
                 
+                try:
+                    if self._http2:
+                        response = await session.get(url, params=params, timeout=timeout)
+                        status, headers, body = response.status_code, response.headers, response.content
+                    else:
+                        async with session.get(
+                            url,
+                            params=params,
+                            timeout=aiohttp.ClientTimeout(total=timeout)
+                        ) as response:
+                            status, headers = response.status, response.headers
+                            body = await response.read()
+                
+                except _ASYNC_TRANSIENT_ERRORS as e:
+                    if attempt >= self.MAX_TRANSIENT_RETRIES:
+                        raise
+                    reason = e
+                
+                else:
+                    if status not in self.TRANSIENT_STATUSES or attempt >= self.MAX_TRANSIENT_RETRIES:
+                        return status, headers, body
+                    reason = f"HTTP {status}"
+            
+            delay = self._backoff_delay(attempt)
+            logger.warning(
+                "Transient error on GET %s (attempt %d/%d): %s. Retrying in %.2f seconds",
+                url,
+                attempt + 1,
+                self.MAX_TRANSIENT_RETRIES,
+                reason,
+                delay
+            )
+            await asyncio.sleep(delay)
+    
+    async def _iter_pages_async(
+        self,
+        properties: Optional[List[str]] = None,
+        archived: bool = False,
+        concurrency: int = 4
+    ):
+        """
+        Fetch deal pages asynchronously, requesting page N+1 while page N is consumed
+        
+        Args:
+            properties: List of deal properties to fetch
+            archived: Whether to include archived deals
+            concurrency: Maximum number of in-flight requests
+            
+        Yields:
+            Dictionaries containing results and pagination info
+        """
+        semaphore = asyncio.BoundedSemaphore(concurrency)
+        pages: asyncio.Queue = asyncio.Queue(maxsize=2)
+        
+        if self._http2:
+            # Prefetched pages share one multiplexed connection
+            client = httpx.AsyncClient(
+                http2=True,
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=8)
+            )
+        elif aiohttp is None:
+            raise HubSpotAPIError("aiohttp is required for async extraction")
+        else:
+            connector = aiohttp.TCPConnector(limit=8, ttl_dns_cache=300)
+            client = aiohttp.ClientSession(headers=self.headers, connector=connector)
+        
+        async with client as session:
+            
+            async def produce_pages():
+                # The next cursor only depends on the previous response, so
+                # request it as soon as that response arrives
+                after = None
+                try:
+                    while True:
+                        params = self._build_deal_params(100, after, properties, archived)
+                        data = await self._fetch_deals_page_async(session, semaphore, params)
+                        await pages.put(data)
+                        
+                        paging = data.get("paging", {})
+                        if "next" not in paging:
+                            break
+                        after = paging["next"]["after"]
+                except Exception as e:
+                    await pages.put(e)
+                    return
+                await pages.put(None)
+            
+            producer = asyncio.create_task(produce_pages())
+            
+            try:
+                while True:
+                    data = await pages.get()
+                    if data is None:
+                        break
+                    if isinstance(data, Exception):
+                        raise data
+                    yield data
+            
+            finally:
+                producer.cancel()
+                try:
+                    await producer
+                except asyncio.CancelledError:
+                    pass
+    
+    async def get_all_deals_async(
+        self,
+        properties: Optional[List[str]] = None,
+        archived: bool = False,
+        checkpoint_callback: Optional[callable] = None,
+        checkpoint_interval: int = 5,
+        concurrency: int = 4
+    ):
+        """
+        Fetch all deals asynchronously, requesting page N+1 while page N is consumed
+        
+        Args:
+            properties: List of deal properties to fetch
+            archived: Whether to include archived deals
+            checkpoint_callback: Function to call at each checkpoint. It runs on
+                a background thread, so it must be thread-safe; checkpoints
+                submitted while one is still being written are coalesced into
+                the latest, and an exception it raises surfaces on a later page
+                or when extraction finishes
+            checkpoint_interval: Number of pages between checkpoints
+            concurrency: Maximum number of in-flight requests
+            
+        Yields:
+            Individual deal records
+        """
+        checkpointer = _CheckpointBatcher(checkpoint_callback) if checkpoint_callback else None
+        page_count = 0
+        total_deals = 0
+        failed = False
+        
+        try:
+            async for data in self._iter_pages_async(properties, archived, concurrency):
                 results = data.get("results", [])
                 page_count += 1
                 
-                # Yield each deal
                 for deal in results:
                     total_deals += 1
                     yield deal
                 
-                logger.info(f"Page {page_count}: {len(results)} deals (Total: {total_deals})")
-                
-                # Checkpoint
-                if checkpoint_callback and page_count % checkpoint_interval == 0:
-                    checkpoint_callback(page=page_count, deals_so_far=total_deals)
-                
-                # Check for next page
-                paging = data.get("paging", {})
-                if "next" not in paging:
-                    logger.info(f"Extraction complete. Total: {total_deals} deals, {page_count} pages")
-                    break
-                
-                after = paging["next"]["after"]
+                logger.info("Page %d: %d deals (Total: %d)", page_count, len(results), total_deals)
                 
-            except HubSpotRateLimitError as e:
-                logger.warning(f"Rate limited: {e}. Waiting before retry...")
-                time.sleep(10)
-                continue
+                # Checkpoint (only reached once the caller asked for the next deal)
+                if checkpointer and page_count % checkpoint_interval == 0:
+                    checkpointer.submit(page=page_count, deals_so_far=total_deals)
+                elif checkpointer:
+                    checkpointer.poll()
             
-            except HubSpotAPIError as e:
-                logger.error(f"API error on page {page_count}: {e}")
-                raise
+            logger.info("Extraction complete. Total: %d deals, %d pages", total_deals, page_count)
+        
+        except HubSpotAPIError as e:
+            logger.error("API error on page %d: %s", page_count, e)
+            failed = True
+            raise
+        
+        except Exception:
+            failed = True
+            raise
+        
+        finally:
+            if checkpointer:
+                await asyncio.to_thread(checkpointer.flush, suppress_errors=failed)
+    
+    @staticmethod
+    def _run_async_generator(agen, maxsize: int = 2) -> Iterator[Any]:
+        """
+        Drive an async generator on a background event loop and yield its items
+        
+        The event loop keeps running while the caller processes each item, so
+        in-flight requests make progress between iterations. Closing the
+        returned generator cancels the async generator, including any request
+        it is waiting on, and joins the worker thread.
+        
+        Args:
+            agen: Async generator to drive
+            maxsize: Number of items buffered ahead of the caller
+        """
+        loop = asyncio.new_event_loop()
+        items: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        done = object()
+        
+        async def pump():
+            try:
+                async for item in agen:
+                    await items.put(item)
+            except Exception as e:
+                await items.put(e)
+                return
+            finally:
+                await agen.aclose()
+            await items.put(done)
+        
+        async def start():
+            return asyncio.ensure_future(pump())
+        
+        async def cancel(task):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        
+        def run_loop():
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_forever()
+                loop.run_until_complete(loop.shutdown_default_executor())
+            finally:
+                loop.close()
+        
+        worker = threading.Thread(target=run_loop, daemon=True)
+        worker.start()
+        task = asyncio.run_coroutine_threadsafe(start(), loop).result()
+        
+        try:
+            while True:
+                item = asyncio.run_coroutine_threadsafe(items.get(), loop).result()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            try:
+                # Blocks only until the cancellation is processed, not until
+                # an in-flight request would have completed
+                asyncio.run_coroutine_threadsafe(cancel(task), loop).result()
+            finally:
+                loop.call_soon_threadsafe(loop.stop)
+                worker.join()
     
     def get_rate_limit_status(self) -> Dict[str, int]:
         """
@@ -289,15 +1625,15 @@ class HubSpot APIService:
         Returns:
             Dictionary with rate limit information
         """
-        now = time.time()
-        cutoff_time = now - self.RATE_LIMIT_WINDOW
-        active_requests = [t for t in self._request_times if t > cutoff_time]
+        elapsed = time.monotonic() - self._last_refill
+        tokens = min(self.RATE_LIMIT_MAX, self._tokens + elapsed * self._refill_rate)
+        remaining = int(tokens)
         
         return {
-            "requests_in_window": len(active_requests),
+            "requests_in_window": self.RATE_LIMIT_MAX - remaining,
             "max_requests": self.RATE_LIMIT_MAX,
             "window_seconds": self.RATE_LIMIT_WINDOW,
-            "remaining": self.RATE_LIMIT_MAX - len(active_requests)
+            "remaining": remaining
         }
 
 
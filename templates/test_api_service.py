@@ -0,0 +1,846 @@
+"""
+Unit tests for HubSpot API Service
+"""
+import asyncio
+import io
+import json
+import pytest
+import threading
+import httpx
+import requests
+import urllib3
+from unittest.mock import patch
+from urllib.parse import urlparse, parse_qs
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError
+
+from services.api_service import _build_session
+from services.api_service import (
+    HubSpotAPIService, HubSpotAPIError, HubSpotAuthenticationError, HubSpotRateLimitError
+)
+
+
+@dataclass(slots=True)
+class _FakeResp:
+    """Lightweight stand-in for requests.Response"""
+    status_code: int
+    content: bytes = b"{}"
+    headers: dict = field(default_factory=dict)
+    raw: Any = None
+    
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code))
+    
+    def close(self):
+        pass
+
+
+def _json_bytes(body):
+    return json.dumps(body).encode()
+
+
+def _page(deals, after=None, status=200, headers=None):
+    """Build a fake deals page response"""
+    body = {"results": deals}
+    if after:
+        body["paging"] = {"next": {"after": after}}
+    return _FakeResp(status, _json_bytes(body), headers or {})
+
+
+class _FakeRaw(io.BytesIO):
+    """Canned raw body; optionally drops the connection after the data"""
+    
+    def __init__(self, data: bytes, fail_with: Exception = None, chunk_size: int = -1):
+        super().__init__(data)
+        self.fail_with = fail_with
+        self.chunk_size = chunk_size
+    
+    def read(self, size=-1):
+        chunk = super().read(size)
+        if not chunk and size != 0 and self.fail_with is not None:
+            raise self.fail_with
+        return chunk
+    
+    def readinto(self, buffer):
+        if self.chunk_size > 0:
+            buffer = memoryview(buffer)[:self.chunk_size]
+        count = super().readinto(buffer)
+        if not count and self.fail_with is not None:
+            raise self.fail_with
+        return count
+
+
+class _DroppedBodyResp:
+    """Response whose connection drops while the body is read"""
+    status_code = 200
+    headers = {}
+    
+    @property
+    def content(self):
+        raise requests.exceptions.ChunkedEncodingError("Connection broken")
+    
+    def close(self):
+        pass
+
+
+class _FakeNetwork:
+    """Serves deal pages by cursor at the adapter level, below requests-cache"""
+    
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+    
+    def send(self, adapter, request, **kwargs):
+        self.requests.append(request)
+        after = parse_qs(urlparse(request.url).query).get("after", [None])[0]
+        raw = urllib3.HTTPResponse(
+            body=io.BytesIO(_json_bytes(self.pages[after])),
+            headers={"Content-Type": "application/json"},
+            status=200,
+            preload_content=False
+        )
+        return adapter.build_response(request, raw)
+    
+    def install(self):
+        """Route every adapter send to this fake"""
+        return patch.object(
+            HTTPAdapter, "send",
+            lambda adapter, request, **kwargs: self.send(adapter, request, **kwargs)
+        )
+
+
+class _FakeClock:
+    """Deterministic replacement for the time module; sleeping advances the clock"""
+    
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+        self.sleeps = []
+    
+    def monotonic(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    fake = _FakeClock()
+    with patch('services.api_service.time', fake):
+        yield fake
+
+
+@pytest.fixture
+def service(clock):
+    svc = HubSpotAPIService(api_key="test_key")
+    yield svc
+    svc.close()
+
+
+class TestTokenBucket:
+    """Test the token-bucket rate limiter"""
+    
+    def test_full_bucket_does_not_sleep(self, service, clock):
+        """A full bucket allows RATE_LIMIT_MAX requests without waiting"""
+        for _ in range(service.RATE_LIMIT_MAX):
+            service._wait_for_rate_limit()
+        
+        assert clock.sleeps == []
+        assert service.get_rate_limit_status()["remaining"] == 0
+    
+    def test_empty_bucket_sleeps_for_one_token(self, service, clock):
+        """Once empty, the limiter waits exactly one refill interval"""
+        for _ in range(service.RATE_LIMIT_MAX + 1):
+            service._wait_for_rate_limit()
+        
+        refill_interval = service.RATE_LIMIT_WINDOW / service.RATE_LIMIT_MAX
+        assert clock.sleeps == [pytest.approx(refill_interval)]
+    
+    def test_tokens_refill_over_time(self, service, clock):
+        """Elapsed time refills the bucket, capped at RATE_LIMIT_MAX"""
+        for _ in range(service.RATE_LIMIT_MAX):
+            service._wait_for_rate_limit()
+        
+        clock.now += 1
+        status = service.get_rate_limit_status()
+        assert status["remaining"] == service.RATE_LIMIT_MAX // service.RATE_LIMIT_WINDOW
+        assert status["requests_in_window"] == service.RATE_LIMIT_MAX - status["remaining"]
+        
+        clock.now += 3600
+        assert service.get_rate_limit_status()["remaining"] == service.RATE_LIMIT_MAX
+
+
+class TestServerRateLimit:
+    """Test rate limiting driven by HubSpot response headers"""
+    
+    def test_waits_for_window_reset_when_server_is_low(self, service, clock):
+        """A low X-HubSpot-RateLimit-Remaining blocks until the interval resets"""
+        headers = {
+            "X-HubSpot-RateLimit-Remaining": "1",
+            "X-HubSpot-RateLimit-Interval-Milliseconds": "10000"
+        }
+        with patch.object(service._session, "request", return_value=_page([], headers=headers)):
+            service.get_deals()
+            clock.now += 4
+            service.get_deals()
+        
+        assert clock.sleeps == [pytest.approx(6)]
+    
+    def test_ignores_server_headroom(self, service, clock):
+        """No waiting while the server reports plenty of requests left"""
+        headers = {"X-HubSpot-RateLimit-Remaining": "100"}
+        with patch.object(service._session, "request", return_value=_page([], headers=headers)):
+            service.get_deals()
+            service.get_deals()
+        
+        assert clock.sleeps == []
+    
+    def test_429_honors_retry_after(self, service, clock):
+        """A 429 sleeps for Retry-After and retries the same request"""
+        responses = [
+            _FakeResp(429, headers={"Retry-After": "5"}),
+            _page([{"id": "1"}])
+        ]
+        with patch.object(service._session, "request", side_effect=responses) as mock_request:
+            data = service.get_deals()
+        
+        assert data["results"] == [{"id": "1"}]
+        assert mock_request.call_count == 2
+        assert clock.sleeps == [5]
+    
+    def test_429_gives_up_after_max_retries(self, service, clock):
+        """Persistent 429s raise HubSpotRateLimitError instead of looping forever"""
+        with patch.object(
+            service._session, "request",
+            return_value=_FakeResp(429, headers={"Retry-After": "1"})
+        ) as mock_request:
+            with pytest.raises(HubSpotRateLimitError):
+                service.get_deals()
+        
+        assert mock_request.call_count == service.MAX_RATE_LIMIT_RETRIES + 1
+
+
+class TestStreamingParse:
+    """Test incremental parsing of streamed deals pages"""
+    
+    def _drain(self, generator):
+        """Collect yielded deals and the returned cursor"""
+        deals = []
+        try:
+            while True:
+                deals.append(next(generator))
+        except StopIteration as stop:
+            return deals, stop.value
+    
+    def test_yields_deals_and_returns_cursor(self, service):
+        """Deals are yielded one by one and the next cursor is returned"""
+        body = json.dumps({
+            "results": [{"id": "1", "properties": {"amount": 1.5}}, {"id": "2", "properties": {}}],
+            "paging": {"next": {"after": "abc"}}
+        }).encode()
+        response = _FakeResp(200, headers={}, raw=_FakeRaw(body))
+        
+        with patch.object(service, "_request_deals_page", return_value=response):
+            deals, next_after = self._drain(service._iter_deals_streaming({}))
+        
+        assert [deal["id"] for deal in deals] == ["1", "2"]
+        assert deals[0]["properties"]["amount"] == 1.5
+        assert next_after == "abc"
+    
+    def test_last_page_returns_no_cursor(self, service):
+        """A page without paging.next ends pagination"""
+        response = _FakeResp(200, headers={}, raw=_FakeRaw(b'{"results": []}'))
+        
+        with patch.object(service, "_request_deals_page", return_value=response):
+            deals, next_after = self._drain(service._iter_deals_streaming({}))
+        
+        assert deals == []
+        assert next_after is None
+    
+    def test_truncated_body_raises_api_error(self, service):
+        """A body cut off mid-object surfaces as HubSpotAPIError"""
+        response = _FakeResp(200, headers={}, raw=_FakeRaw(b'{"results": [{"id": "1"}, {"id": '))
+        
+        with patch.object(service, "_request_deals_page", return_value=response):
+            with pytest.raises(HubSpotAPIError):
+                self._drain(service._iter_deals_streaming({}))
+    
+    def test_connection_drop_raises_api_error(self, service):
+        """A urllib3 read error mid-body surfaces as HubSpotAPIError once retries run out"""
+        raw = _FakeRaw(b'{"results": [{"id": "1"}, ', fail_with=ProtocolError("Connection broken"))
+        response = _FakeResp(200, headers={}, raw=raw)
+        
+        with patch.object(service, "_request_deals_page", return_value=response) as mock_page:
+            with pytest.raises(HubSpotAPIError, match="Connection lost"):
+                self._drain(service._iter_deals_streaming({}))
+        
+        assert mock_page.call_count == service.MAX_TRANSIENT_RETRIES + 1
+
+
+class TestIncrementalSync:
+    """Test Search API based incremental extraction"""
+    
+    @staticmethod
+    def _deal(deal_id, modified):
+        return {"id": deal_id, "properties": {"hs_lastmodifieddate": modified}}
+    
+    def test_rejects_archived_and_prefetch(self, service):
+        """since cannot be combined with options the Search API ignores"""
+        with pytest.raises(ValueError):
+            next(service.get_all_deals(since="2024-01-01T00:00:00Z", archived=True))
+        with pytest.raises(ValueError):
+            next(service.get_all_deals(since="2024-01-01T00:00:00Z", prefetch=True))
+    
+    def test_checkpoint_last_modified_round_trips(self, service):
+        """A checkpoint's last_modified string is accepted as the next since"""
+        pages = [{"results": [
+            self._deal("1", "2024-01-01T10:00:00.000Z"),
+            self._deal("2", "2024-01-02T10:00:00.000Z")
+        ]}]
+        checkpoints = []
+        
+        with patch.object(service, "get_changed_deals", side_effect=pages):
+            list(service.get_all_deals(
+                since=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                checkpoint_callback=lambda **state: checkpoints.append(state)
+            ))
+        
+        assert checkpoints[-1]["last_modified"] == "2024-01-02T10:00:00.000Z"
+        
+        with patch.object(service, "get_changed_deals", return_value={"results": []}) as mock_search:
+            list(service.get_all_deals(since=checkpoints[-1]["last_modified"]))
+        
+        assert mock_search.call_args.args[0] == datetime(2024, 1, 2, 10, tzinfo=timezone.utc)
+    
+    def test_last_modified_compares_parsed_timestamps(self, service):
+        """Timestamps with and without fractional seconds are ordered by time"""
+        page = {"results": [
+            self._deal("1", "2024-01-01T10:00:00.500Z"),
+            self._deal("2", "2024-01-01T10:00:00Z")
+        ]}
+        checkpoints = []
+        
+        with patch.object(service, "get_changed_deals", return_value=page):
+            list(service.get_all_deals(
+                since="2024-01-01T00:00:00Z",
+                checkpoint_callback=lambda **state: checkpoints.append(state)
+            ))
+        
+        assert checkpoints[-1]["last_modified"] == "2024-01-01T10:00:00.500Z"
+    
+    def test_search_requests_use_their_own_rate_limit(self, service, clock):
+        """Search calls beyond the search bucket wait even with general tokens left"""
+        with patch.object(service, "_send_request", return_value=_page([])):
+            for _ in range(service.SEARCH_RATE_LIMIT_MAX + 1):
+                service.get_changed_deals("2024-01-01T00:00:00Z")
+        
+        assert clock.sleeps == [pytest.approx(service.SEARCH_RATE_LIMIT_WINDOW / service.SEARCH_RATE_LIMIT_MAX)]
+    
+    def test_restarts_query_at_result_limit(self, service):
+        """Reaching the result limit re-queries from the newest timestamp seen"""
+        service.SEARCH_RESULT_LIMIT = 2
+        since = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        pages = [
+            {"results": [self._deal("1", "2024-01-01T01:00:00Z")], "paging": {"next": {"after": "1"}}},
+            {"results": [self._deal("2", "2024-01-01T02:00:00Z")], "paging": {"next": {"after": "2"}}},
+            {"results": [self._deal("2", "2024-01-01T02:00:00Z"), self._deal("3", "2024-01-01T03:00:00Z")]}
+        ]
+        
+        with patch.object(service, "get_changed_deals", side_effect=pages) as mock_search:
+            deals = list(service.get_all_deals(since=since))
+        
+        assert [deal["id"] for deal in deals] == ["1", "2", "2", "3"]
+        calls = mock_search.call_args_list
+        assert [call.kwargs["after"] for call in calls] == [None, "1", None]
+        assert calls[2].args[0] == datetime(2024, 1, 1, 2, tzinfo=timezone.utc)
+    
+    def test_result_limit_without_progress_raises(self, service):
+        """A full window of deals sharing one timestamp cannot be paged past"""
+        service.SEARCH_RESULT_LIMIT = 2
+        since = "2024-01-01T01:00:00Z"
+        page = {
+            "results": [self._deal("1", since), self._deal("2", since)],
+            "paging": {"next": {"after": "2"}}
+        }
+        
+        with patch.object(service, "get_changed_deals", return_value=page):
+            with pytest.raises(HubSpotAPIError, match="share"):
+                list(service.get_all_deals(since=since))
+
+
+class TestBatchRead:
+    """Test fetching deals by ID via the batch read endpoint"""
+    
+    @staticmethod
+    def _fake_batch_read(missing=()):
+        """Answer batch reads in reverse order, omitting missing IDs"""
+        requested = []
+        
+        def send_request(method, url, timeout, json=None, **kwargs):
+            chunk = [item["id"] for item in json["inputs"]]
+            requested.append(chunk)
+            results = [{"id": deal_id} for deal_id in reversed(chunk) if deal_id not in missing]
+            return _FakeResp(200, _json_bytes({"results": results}))
+        
+        return send_request, requested
+    
+    def test_sends_batches_of_100(self, service):
+        """IDs are split into batch requests of at most 100"""
+        ids = [str(i) for i in range(250)]
+        send_request, requested = self._fake_batch_read()
+        
+        with patch.object(service, "_send_request", side_effect=send_request):
+            service.get_deals_by_ids(ids)
+        
+        assert sorted(len(chunk) for chunk in requested) == [50, 100, 100]
+        assert sorted(deal_id for chunk in requested for deal_id in chunk) == sorted(ids)
+    
+    def test_restores_input_order(self, service):
+        """Results come back in the order the IDs were requested"""
+        ids = [str(i) for i in range(150, 0, -1)]
+        send_request, _ = self._fake_batch_read()
+        
+        with patch.object(service, "_send_request", side_effect=send_request):
+            deals = service.get_deals_by_ids(ids)
+        
+        assert [deal["id"] for deal in deals] == ids
+    
+    def test_omits_missing_ids(self, service):
+        """IDs the API does not return are dropped without reordering the rest"""
+        ids = ["5", "3", "9", "1"]
+        send_request, _ = self._fake_batch_read(missing={"3"})
+        
+        with patch.object(service, "_send_request", side_effect=send_request):
+            deals = service.get_deals_by_ids(ids)
+        
+        assert [deal["id"] for deal in deals] == ["5", "9", "1"]
+
+
+class TestCheckpoints:
+    """Test background checkpoint writes during extraction"""
+    
+    @pytest.fixture(autouse=True)
+    def no_streaming(self):
+        """Page through get_deals rather than the streaming parser"""
+        with patch('services.api_service.ijson', None):
+            yield
+    
+    def test_final_checkpoint_is_written(self, service):
+        """The latest checkpoint is flushed when extraction completes"""
+        pages = [
+            {"results": [{"id": "1"}], "paging": {"next": {"after": "1"}}},
+            {"results": [{"id": "2"}]}
+        ]
+        checkpoints = []
+        
+        with patch.object(service, "get_deals", side_effect=pages):
+            deals = list(service.get_all_deals(
+                checkpoint_callback=lambda **state: checkpoints.append(state),
+                checkpoint_interval=1
+            ))
+        
+        assert len(deals) == 2
+        assert checkpoints[-1] == {"page": 2, "deals_so_far": 2}
+    
+    def test_callback_error_surfaces(self, service):
+        """A failing callback is raised to the caller once it completes"""
+        def callback(**state):
+            raise OSError("disk full")
+        
+        with patch.object(service, "get_deals", return_value={"results": [{"id": "1"}]}):
+            with pytest.raises(OSError, match="disk full"):
+                list(service.get_all_deals(checkpoint_callback=callback, checkpoint_interval=1))
+    
+    def test_callback_error_does_not_mask_api_error(self, service):
+        """The extraction error propagates even if the final checkpoint also fails"""
+        def callback(**state):
+            raise OSError("disk full")
+        
+        pages = [
+            {"results": [{"id": "1"}], "paging": {"next": {"after": "1"}}},
+            HubSpotAPIError("boom")
+        ]
+        
+        with patch.object(service, "get_deals", side_effect=pages):
+            with pytest.raises(HubSpotAPIError, match="boom"):
+                list(service.get_all_deals(checkpoint_callback=callback, checkpoint_interval=1))
+
+
+class TestValidation:
+    """Test credential validation modes"""
+    
+    def test_lazy_is_pending_until_first_request(self, service):
+        """Lazy validation makes no request and reports a deferred, not-yet-valid token"""
+        with patch.object(service._session, "request", return_value=_page([])) as mock_request:
+            pending = service.validate_credentials(mode="lazy")
+            service.get_deals()
+            validated = service.validate_credentials(mode="lazy")
+        
+        assert mock_request.call_count == 1
+        assert pending["valid"] is False and pending["deferred"] is True
+        assert validated["valid"] is True and validated["deferred"] is False
+    
+    def test_eager_validation_on_construction(self, clock):
+        """A non-lazy validate mode checks the token in __init__"""
+        response = _FakeResp(401)
+        with patch("requests.Session.request", return_value=response) as mock_request:
+            with pytest.raises(HubSpotAuthenticationError):
+                HubSpotAPIService(api_key="bad_key", validate="cheap")
+        
+        assert mock_request.call_args.args[1].endswith("/account-info/v3/details")
+
+
+class TestTransientRetries:
+    """Test that each transient failure is retried by exactly one layer"""
+    
+    def test_adapter_leaves_status_retries_to_the_service(self):
+        """The urllib3 Retry on the adapter never retries on status codes"""
+        retry = _build_session().get_adapter("https://api.hubapi.com").max_retries
+        
+        for status in (429, 500, 502, 503, 504):
+            assert not retry.is_retry("GET", status, has_retry_after=True)
+    
+    def test_gateway_error_is_retried(self, service, clock):
+        """A 503 is retried once with backoff, then succeeds"""
+        responses = [_FakeResp(503), _page([{"id": "1"}])]
+        with patch.object(service._session, "request", side_effect=responses) as mock_request:
+            data = service.get_deals()
+        
+        assert data["results"] == [{"id": "1"}]
+        assert mock_request.call_count == 2
+        assert len(clock.sleeps) == 1
+    
+    def test_gateway_error_retries_are_capped(self, service, clock):
+        """Persistent 502s raise after MAX_TRANSIENT_RETRIES retries"""
+        with patch.object(service._session, "request", return_value=_FakeResp(502)) as mock_request:
+            with pytest.raises(HubSpotAPIError):
+                service.get_deals()
+        
+        assert mock_request.call_count == service.MAX_TRANSIENT_RETRIES + 1
+    
+    def test_connection_error_is_left_to_the_adapter(self, service, clock):
+        """Errors before a response were already retried by urllib3"""
+        error = requests.exceptions.ConnectionError("refused")
+        with patch.object(service._session, "request", side_effect=error) as mock_request:
+            with pytest.raises(HubSpotAPIError):
+                service.get_deals()
+        
+        assert mock_request.call_count == 1
+    
+    def test_dropped_body_is_retried(self, service, clock):
+        """A connection lost while reading the body is retried"""
+        responses = [_DroppedBodyResp(), _page([{"id": "1"}])]
+        with patch.object(service._session, "request", side_effect=responses) as mock_request:
+            data = service.get_deals()
+        
+        assert data["results"] == [{"id": "1"}]
+        assert mock_request.call_count == 2
+    
+    def test_streamed_page_is_replayed_without_duplicates(self, service, clock):
+        """A page cut off mid-stream is re-requested and resumes after the last deal"""
+        body = _json_bytes({"results": [{"id": "1"}, {"id": "2"}, {"id": "3"}]})
+        dropped = _FakeRaw(body[:30], fail_with=ProtocolError("Connection broken"), chunk_size=8)
+        responses = [
+            _FakeResp(200, headers={}, raw=dropped),
+            _FakeResp(200, headers={}, raw=_FakeRaw(body))
+        ]
+        
+        with patch.object(service, "_request_deals_page", side_effect=responses) as mock_page:
+            deals = list(service._iter_deals_streaming({}))
+        
+        assert [deal["id"] for deal in deals] == ["1", "2", "3"]
+        assert mock_page.call_count == 2
+    
+    def test_async_page_fetch_retries_gateway_errors(self, service):
+        """The async path retries 5xx responses before giving up"""
+        statuses = iter([503, 504, 200])
+        calls = []
+        
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(next(statuses), json={"results": [{"id": "1"}]})
+        
+        async def fetch():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                return await service._fetch_deals_page_async(client, asyncio.BoundedSemaphore(1), {})
+        
+        service._http2 = True
+        with patch.object(service, "_backoff_delay", return_value=0):
+            data = asyncio.run(fetch())
+        
+        assert data["results"] == [{"id": "1"}]
+        assert len(calls) == 3
+
+
+class TestResponseCache:
+    """Test the on-disk response cache"""
+    
+    @pytest.fixture
+    def network(self):
+        fake = _FakeNetwork({
+            None: {"results": [{"id": "1"}], "paging": {"next": {"after": "2"}}},
+            "2": {"results": [{"id": "2"}]}
+        })
+        with fake.install():
+            yield fake
+    
+    def _cached_service(self, tmp_path, api_key="test_key"):
+        return HubSpotAPIService(api_key=api_key, cache=True, cache_name=str(tmp_path / "cache"))
+    
+    def test_rerun_streams_cached_pages(self, clock, network, tmp_path):
+        """A second extraction parses cursor pages served from the cache"""
+        for _ in range(2):
+            with self._cached_service(tmp_path) as service:
+                assert [deal["id"] for deal in service.get_all_deals()] == ["1", "2"]
+        
+        afters = [parse_qs(urlparse(r.url).query).get("after") for r in network.requests]
+        assert afters == [None, ["2"], None]
+    
+    def test_first_page_bypasses_cache(self, clock, network, tmp_path):
+        """The first page is always fetched fresh; cursor pages are cached"""
+        with self._cached_service(tmp_path) as service:
+            service.get_deals()
+            service.get_deals()
+            service.get_deals(after="2")
+            service.get_deals(after="2")
+        
+        assert len(network.requests) == 3
+    
+    def test_validation_is_never_cached(self, clock, network, tmp_path):
+        """Every credential check reaches the server"""
+        with self._cached_service(tmp_path) as service:
+            service.validate_credentials()
+            service.validate_credentials()
+        
+        assert len(network.requests) == 2
+    
+    def test_cache_is_per_token(self, clock, network, tmp_path):
+        """One token's cached pages are never served to another token"""
+        with self._cached_service(tmp_path, api_key="token_a") as service:
+            service.get_deals(after="2")
+        with self._cached_service(tmp_path, api_key="token_b") as service:
+            service.get_deals(after="2")
+        
+        assert len(network.requests) == 2
+        assert network.requests[1].headers["Authorization"] == "Bearer token_b"
+    
+    def test_cache_hit_skips_rate_limiter(self, clock, network, tmp_path):
+        """A cache hit doesn't wait even when the rate limit is exhausted"""
+        with self._cached_service(tmp_path) as service:
+            service.get_deals(after="2")
+            service._tokens = 0
+            service._server_remaining = 0
+            service._server_reset_at = clock.now + 10
+            
+            data = service.get_deals(after="2")
+        
+        assert data["results"] == [{"id": "2"}]
+        assert len(network.requests) == 1
+        assert clock.sleeps == []
+
+
+class TestNonJSONBodies:
+    """Test that unparseable bodies surface as HubSpot exceptions"""
+    
+    HTML = b"<html><body>502 Bad Gateway</body></html>"
+    
+    def test_page_body_raises_api_error(self, service):
+        """A non-JSON page body raises HubSpotAPIError, not a decoder error"""
+        with patch.object(service._session, "request", return_value=_FakeResp(200, self.HTML)):
+            with pytest.raises(HubSpotAPIError, match="Invalid JSON"):
+                service.get_deals()
+    
+    def test_forbidden_html_raises_authentication_error(self, service):
+        """A 403 without a JSON body still fails validation cleanly"""
+        with patch.object(service._session, "request", return_value=_FakeResp(403, self.HTML)):
+            with pytest.raises(HubSpotAuthenticationError):
+                service.validate_credentials()
+
+
+class TestPrefetch:
+    """Test pages fetched ahead of the caller on a background event loop"""
+    
+    PAGES = {
+        None: {"results": [{"id": "1"}, {"id": "2"}], "paging": {"next": {"after": "2"}}},
+        "2": {"results": [{"id": "3"}, {"id": "4"}], "paging": {"next": {"after": "4"}}},
+        "4": {"results": [{"id": "5"}]}
+    }
+    
+    @staticmethod
+    def _fake_fetch(pages, fetched=None):
+        """Async page fetcher serving pages by cursor; values may be exceptions"""
+        async def fetch(session, semaphore, params, timeout=30):
+            after = params.get("after")
+            if fetched is not None:
+                fetched.append(after)
+            page = pages[after]
+            if isinstance(page, Exception):
+                raise page
+            if callable(page):
+                return await page()
+            return page
+        
+        return fetch
+    
+    def test_yields_every_page_in_order(self, service):
+        """All deals arrive in page order"""
+        with patch.object(service, "_fetch_deals_page_async", self._fake_fetch(self.PAGES)):
+            deals = list(service.get_all_deals(prefetch=True))
+        
+        assert [deal["id"] for deal in deals] == ["1", "2", "3", "4", "5"]
+    
+    def test_producer_error_reaches_caller(self, service):
+        """An error fetching a later page is raised after the earlier deals"""
+        pages = dict(self.PAGES, **{"2": HubSpotAPIError("boom")})
+        deals = []
+        
+        with patch.object(service, "_fetch_deals_page_async", self._fake_fetch(pages)):
+            with pytest.raises(HubSpotAPIError, match="boom"):
+                for deal in service.get_all_deals(prefetch=True):
+                    deals.append(deal["id"])
+        
+        assert deals == ["1", "2"]
+    
+    def test_close_cancels_in_flight_request(self, service):
+        """Closing mid-stream cancels the pending fetch and joins the worker"""
+        cancelled = threading.Event()
+        
+        async def never_answers():
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        
+        pages = dict(self.PAGES, **{"2": never_answers})
+        threads_before = threading.active_count()
+        
+        with patch.object(service, "_fetch_deals_page_async", self._fake_fetch(pages)):
+            deals = service.get_all_deals(prefetch=True)
+            assert next(deals)["id"] == "1"
+            
+            closer = threading.Thread(target=deals.close)
+            closer.start()
+            closer.join(timeout=5)
+        
+        assert not closer.is_alive()
+        assert cancelled.is_set()
+        assert threading.active_count() == threads_before
+    
+    def test_checkpoints_only_consumed_pages(self, service):
+        """Pages fetched ahead but not yet consumed are never checkpointed"""
+        fetched = []
+        checkpoints = []
+        
+        with patch.object(service, "_fetch_deals_page_async", self._fake_fetch(self.PAGES, fetched)):
+            deals = service.get_all_deals(
+                prefetch=True,
+                checkpoint_callback=lambda **state: checkpoints.append(state),
+                checkpoint_interval=1
+            )
+            consumed = [next(deals)["id"] for _ in range(3)]
+            deals.close()
+        
+        assert consumed == ["1", "2", "3"]
+        assert fetched[:2] == [None, "2"]
+        assert checkpoints == [{"page": 1, "deals_so_far": 2}]
+    
+    def test_async_extraction(self, service):
+        """get_all_deals_async yields every deal and checkpoints each page"""
+        checkpoints = []
+        
+        async def collect():
+            return [
+                deal["id"]
+                async for deal in service.get_all_deals_async(
+                    checkpoint_callback=lambda **state: checkpoints.append(state),
+                    checkpoint_interval=1
+                )
+            ]
+        
+        with patch.object(service, "_fetch_deals_page_async", self._fake_fetch(self.PAGES)):
+            deals = asyncio.run(collect())
+        
+        assert deals == ["1", "2", "3", "4", "5"]
+        assert checkpoints[-1] == {"page": 3, "deals_so_far": 5}
+
+
+class TestSharedSession:
+    """Test the process-wide connection pool shared across instances"""
+    
+    @pytest.fixture(autouse=True)
+    def isolated_registry(self):
+        with patch.dict('services.api_service._SHARED_SESSIONS', clear=True):
+            yield
+    
+    def test_each_instance_sends_its_own_token(self, clock):
+        """Two tokens share one pooled session without sharing credentials"""
+        network = _FakeNetwork({None: {"results": []}})
+        service_a = HubSpotAPIService(api_key="token_a", shared_session=True)
+        service_b = HubSpotAPIService(api_key="token_b", shared_session=True)
+        
+        with network.install():
+            service_a.get_deals()
+            service_b.get_deals()
+            service_a.get_deals()
+        
+        assert service_a._session is service_b._session
+        assert "Authorization" not in service_a._session.headers
+        assert [r.headers["Authorization"] for r in network.requests] == [
+            "Bearer token_a", "Bearer token_b", "Bearer token_a"
+        ]
+    
+    def test_close_leaves_shared_session_open(self, clock):
+        """Closing one instance doesn't close the pool other instances use"""
+        service_a = HubSpotAPIService(api_key="token_a", shared_session=True)
+        service_b = HubSpotAPIService(api_key="token_b", shared_session=True)
+        
+        with patch.object(service_a._session, "close") as mock_close:
+            service_a.close()
+        
+        mock_close.assert_not_called()
+        
+        network = _FakeNetwork({None: {"results": [{"id": "1"}]}})
+        with network.install():
+            assert service_b.get_deals()["results"] == [{"id": "1"}]
+
+
+class TestColumnar:
+    """Test column batch extraction"""
+    
+    def test_batches_columns(self, service):
+        """Batches split at batch_size, the last one is partial, and gaps are None"""
+        deals = [
+            {"id": "1", "properties": {"dealname": "A", "amount": "10"}},
+            {"id": "2", "properties": {"dealname": "B"}},
+            {"id": "3", "properties": {"amount": "30"}},
+            {"id": "4"},
+            {"id": "5", "properties": {"dealname": "E", "amount": "50"}}
+        ]
+        
+        with patch.object(service, "get_all_deals", return_value=iter(deals)):
+            batches = list(service.get_all_deals_columnar(
+                properties=["dealname", "amount"],
+                batch_size=2
+            ))
+        
+        assert batches == [
+            {"id": ["1", "2"], "dealname": ["A", "B"], "amount": ["10", None]},
+            {"id": ["3", "4"], "dealname": [None, None], "amount": ["30", None]},
+            {"id": ["5"], "dealname": ["E"], "amount": ["50"]}
+        ]
+    
+    def test_exact_multiple_has_no_empty_batch(self, service):
+        """No trailing empty batch when the deal count divides evenly"""
+        deals = [{"id": str(i), "properties": {}} for i in range(4)]
+        
+        with patch.object(service, "get_all_deals", return_value=iter(deals)):
+            batches = list(service.get_all_deals_columnar(properties=["dealname"], batch_size=2))
+        
+        assert [batch["id"] for batch in batches] == [["0", "1"], ["2", "3"]]